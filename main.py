@@ -5,9 +5,12 @@ Tabbed GUI – Scripts 1, 2, 4
 
 import sys
 import os
-import threading
+import queue
+import multiprocessing
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 # ── Make sure the src package is importable when frozen ──────────────────────
 if getattr(sys, "frozen", False):
@@ -17,9 +20,16 @@ else:
 
 sys.path.insert(0, BASE_DIR)
 
-from src.script1_global_stock    import create_global_stock_lookup
-from src.script2_main_store_stock import create_main_store_stock_lookup
-from src.script4_inventory_calc  import InventoryCalculator
+# The src.script* backends (and with them pandas) are imported inside each
+# tab's worker task, so the window appears without waiting on those imports.
+
+# ── Background workers ───────────────────────────────────────────────────────
+# Each tab's backend runs in a worker process, so tabs run side by side
+# instead of contending for the GIL. Log lines from every process travel as
+# (widget path, message) pairs through LOG_Q, which the App drains on a timer.
+MP_CTX    = multiprocessing.get_context("spawn")
+LOG_Q     = None    # created in main(); handed to workers by _init_worker
+_EXECUTOR = None
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -84,23 +94,119 @@ def log_widget(parent) -> tk.Text:
 
 def log_append(txt: tk.Text, msg: str):
     """Thread-safe log append."""
-    def _do():
+    LOG_Q.put((str(txt), msg))
+
+
+def drain_log(root: tk.Tk, max_lines: int = 500):
+    """
+    Move queued log lines into their Text widgets, then re-arm.
+
+    Lines are grouped per widget so each tick costs one insert/redraw per
+    log, however chatty the workers are.
+    """
+    batches = {}
+    for _ in range(max_lines):
+        try:
+            path, msg = LOG_Q.get_nowait()
+        except queue.Empty:
+            break
+        batches.setdefault(path, []).append(msg)
+
+    for path, lines in batches.items():
+        txt = root.nametowidget(path)
         txt.configure(state="normal")
-        txt.insert("end", msg + "\n")
+        txt.insert("end", "\n".join(lines) + "\n")
         txt.see("end")
         txt.configure(state="disabled")
-    txt.after(0, _do)
+    root.after(50, drain_log, root)
+
+
+def _init_worker(log_q):
+    global LOG_Q
+    LOG_Q = log_q
+
+
+def _worker_log(log_path: str):
+    """log_fn for a worker process – forwards lines to the GUI's log widget."""
+    return lambda m: LOG_Q.put((log_path, m))
+
+
+def _global_stock_task(log_path: str, inp: str, outp: str):
+    from src.script1_global_stock import create_global_stock_lookup
+    create_global_stock_lookup(inp, outp, log_fn=_worker_log(log_path))
 
 
-def run_in_thread(fn, on_done):
-    """Run fn() in background; call on_done(err_or_None) on main thread."""
-    def worker():
+def _main_store_task(log_path: str, inp: str, outp: str):
+    from src.script2_main_store_stock import create_main_store_stock_lookup
+    create_main_store_stock_lookup(inp, outp, log_fn=_worker_log(log_path))
+
+
+def _inventory_task(log_path: str, fields: dict):
+    from src.script4_inventory_calc import InventoryCalculator
+    calc = InventoryCalculator(log_fn=_worker_log(log_path))
+    calc.run(
+        master_file=fields["Master Data"],
+        global_stock_file=fields["Global Stock Lookup"],
+        main_store_file=fields["Main Store Lookup"],
+        expected_items_file=fields["Expected Items"],
+        output_file=fields["Output file"],
+    )
+
+
+def _new_executor() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=min(3, os.cpu_count() or 1),  # one job per tab at most
+        mp_context=MP_CTX,
+        initializer=_init_worker,
+        initargs=(LOG_Q,),
+    )
+
+
+def stop_workers():
+    """Shut the pool down without waiting: queued jobs are cancelled, running ones killed."""
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        return
+    # shutdown(wait=False) leaves running workers alive, and the interpreter's
+    # exit hook would then wait for them – terminate them instead. The pool's
+    # workers are the only processes this app starts, so they are exactly
+    # multiprocessing's live children.
+    _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    for proc in multiprocessing.active_children():
+        proc.terminate()
+    _EXECUTOR = None
+
+
+def run_in_process(widget: tk.Widget, on_done, fn, *args):
+    """Run fn(*args) in a worker process; call on_done(err_or_None) on the Tk thread."""
+    global _EXECUTOR
+    try:
+        if _EXECUTOR is None:
+            _EXECUTOR = _new_executor()
         try:
-            fn()
-            on_done(None)
-        except Exception as e:
-            on_done(e)
-    threading.Thread(target=worker, daemon=True).start()
+            future = _EXECUTOR.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for running out of memory) and took
+            # the pool with it – start a fresh one for this job
+            stop_workers()
+            _EXECUTOR = _new_executor()
+            future = _EXECUTOR.submit(fn, *args)
+    except Exception as err:  # report through the tab instead of leaving it "Running…"
+        widget.after(0, on_done, err)
+        return
+    future.add_done_callback(lambda f: _report_done(widget, on_done, f))
+
+
+def _report_done(widget: tk.Widget, on_done, future):
+    """Done-callback: hand the job's error (or None) to on_done on the Tk thread."""
+    if future.cancelled():  # f.exception() would raise CancelledError
+        err = RuntimeError("Job cancelled – the worker pool was shut down")
+    else:
+        err = future.exception()
+    try:
+        widget.after(0, on_done, err)
+    except (tk.TclError, RuntimeError):
+        pass  # the window is already gone (pool shut down on exit)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -156,9 +262,6 @@ class Tab1(tk.Frame):
         self._run_btn.configure(state="disabled", text="Running…")
         self._status.configure(text="", fg="black")
 
-        def task():
-            create_global_stock_lookup(inp, outp, log_fn=lambda m: log_append(self._log, m))
-
         def done(err):
             self._run_btn.configure(state="normal", text="▶  Generate Global Stock Lookup")
             if err:
@@ -167,7 +270,7 @@ class Tab1(tk.Frame):
             else:
                 self._status.configure(text="✅ Done! File saved.", fg=SUCCESS)
 
-        run_in_thread(task, done)
+        run_in_process(self._log, done, _global_stock_task, str(self._log), inp, outp)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -222,9 +325,6 @@ class Tab2(tk.Frame):
         self._run_btn.configure(state="disabled", text="Running…")
         self._status.configure(text="", fg="black")
 
-        def task():
-            create_main_store_stock_lookup(inp, outp, log_fn=lambda m: log_append(self._log, m))
-
         def done(err):
             self._run_btn.configure(state="normal", text="▶  Generate Main Store Stock Lookup")
             if err:
@@ -233,7 +333,7 @@ class Tab2(tk.Frame):
             else:
                 self._status.configure(text="✅ Done! File saved.", fg=SUCCESS)
 
-        run_in_thread(task, done)
+        run_in_process(self._log, done, _main_store_task, str(self._log), inp, outp)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -317,16 +417,6 @@ class Tab3(tk.Frame):
         self._run_btn.configure(state="disabled", text="Running…")
         self._status.configure(text="", fg="black")
 
-        def task():
-            calc = InventoryCalculator(log_fn=lambda m: log_append(self._log, m))
-            calc.run(
-                master_file=fields["Master Data"],
-                global_stock_file=fields["Global Stock Lookup"],
-                main_store_file=fields["Main Store Lookup"],
-                expected_items_file=fields["Expected Items"],
-                output_file=fields["Output file"],
-            )
-
         def done(err):
             self._run_btn.configure(state="normal", text="▶  Generate Inventory Calculation")
             if err:
@@ -335,7 +425,7 @@ class Tab3(tk.Frame):
             else:
                 self._status.configure(text="✅ Done! File saved.", fg=SUCCESS)
 
-        run_in_thread(task, done)
+        run_in_process(self._log, done, _inventory_task, str(self._log), fields)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -383,11 +473,17 @@ class App(tk.Tk):
             font=("Segoe UI", 8), bg=BG, fg="#AAA",
         ).pack(pady=(0, 4))
 
+        self.after(50, drain_log, self)
+
 
 def main():
+    global LOG_Q
+    LOG_Q = MP_CTX.Queue()
     app = App()
     app.mainloop()
+    stop_workers()
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # required for worker processes in the frozen app
     main()
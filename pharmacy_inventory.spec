@@ -21,12 +21,16 @@ a = Analysis(
         'openpyxl.utils',
         'pandas',
         'numpy',
+        'pyarrow',
+        'xlsxwriter',
         'math',
         'threading',
         'tkinter',
         'tkinter.ttk',
         'tkinter.filedialog',
         'tkinter.messagebox',
+        'src._agg',
+        'src._lookup_io',
         'src.script1_global_stock',
         'src.script2_main_store_stock',
         'src.script4_inventory_calc',
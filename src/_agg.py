@@ -0,0 +1,95 @@
+"""
+Group-sum and filter helpers shared by Scripts 1, 2 and 4
+Hospital Pharmacy Inventory Management
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import get_num_threads, njit, prange
+except ImportError:  # numba is optional – np.bincount is used instead
+    njit = None
+
+# Below this many rows thread start-up costs more than bincount's single pass
+PARALLEL_MIN_ROWS = 200_000
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _groupsum_parallel(codes, vals, n, nthreads):
+        # Each thread accumulates into its own row of the local arrays, so no
+        # atomics are needed; the per-thread partials are reduced at the end.
+        step = (codes.size + nthreads - 1) // nthreads
+        local_sum = np.zeros((nthreads, n))
+        local_cnt = np.zeros((nthreads, n), dtype=np.int64)
+        for t in prange(nthreads):
+            for i in range(t * step, min((t + 1) * step, codes.size)):
+                c = codes[i]
+                if c >= 0:
+                    local_sum[t, c] += vals[i]
+                    local_cnt[t, c] += 1
+        return local_sum.sum(axis=0), local_cnt.sum(axis=0)
+
+
+def groupsum(codes: np.ndarray, vals: np.ndarray, n: int):
+    """
+    Sum vals per group code.
+
+    Args:
+        codes: Integer group codes in [0, n); negative codes (missing keys) are skipped
+        vals:  float64 values, same length as codes
+        n:     Number of groups
+
+    Returns:
+        (totals, counts) – float64 sums and int64 row counts, both of length n
+    """
+    if njit is not None and codes.size >= PARALLEL_MIN_ROWS:
+        return _groupsum_parallel(codes, vals, n, get_num_threads())
+
+    valid = codes >= 0
+    codes = codes[valid]
+    return (
+        np.bincount(codes, weights=vals[valid], minlength=n),
+        np.bincount(codes, minlength=n),
+    )
+
+
+def store_equals(stores: pd.Series, name: str) -> np.ndarray:
+    """Boolean mask of rows whose store is name; blanks are False."""
+    if isinstance(stores.dtype, pd.CategoricalDtype):
+        # Already coded – one integer compare (-1 if the store never occurs)
+        code = stores.cat.categories.get_indexer([name])[0]
+        return (stores.cat.codes.to_numpy() == code) & (code >= 0)
+    # A plain compare; casting to category first would hash every string
+    # just to build this one mask
+    return (stores == name).to_numpy(dtype=bool, na_value=False)
+
+
+def category_sums(keys: pd.Series, vals: np.ndarray) -> pd.Series:
+    """
+    Sum vals per category of the categorical Series keys.
+
+    Returns totals indexed by the categories that occur (sorted); rows with a
+    missing key are skipped, as in groupby.
+    """
+    cat = keys.cat
+    totals, counts = groupsum(cat.codes.to_numpy(), vals, len(cat.categories))
+    seen = counts > 0  # unused categories (e.g. filtered-out rows) are dropped
+    return pd.Series(totals[seen], index=cat.categories[seen])
+
+
+def combine_block_totals(partials) -> pd.Series:
+    """
+    Merge per-block totals (from text-parsed CSV blocks) into one Series.
+
+    Item codes are made numeric when they all are, matching a whole-file
+    Arrow read that infers int64; "00123" and "123" then become one code, so
+    the sum happens after the conversion. The result is sorted by code.
+    """
+    totals = pd.concat(partials) if partials else pd.Series(dtype=np.float64)
+    try:
+        totals.index = pd.to_numeric(totals.index)
+    except (ValueError, TypeError):
+        pass
+    return totals.groupby(level=0).sum()
@@ -0,0 +1,177 @@
+"""
+Lookup, input-cache and streamed-CSV file I/O shared by Scripts 1, 2 and 4
+Hospital Pharmacy Inventory Management
+"""
+
+import glob
+import hashlib
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import xlsxwriter
+from pyarrow import csv as pacsv
+
+try:
+    import python_calamine  # noqa: F401 – only needed as a pandas read engine
+    EXCEL_ENGINE = "calamine"
+except ImportError:  # python-calamine is optional – pandas' default engine is used instead
+    EXCEL_ENGINE = None
+
+
+def sidecar_path(xlsx_file: str) -> str:
+    """Path of the hidden Feather copy kept next to a lookup workbook."""
+    folder, name = os.path.split(xlsx_file)
+    return os.path.join(folder, "." + os.path.splitext(name)[0] + ".feather")
+
+
+def _write_feather(df: pd.DataFrame, path: str) -> bool:
+    """
+    Write df to path as Feather, all or nothing; returns whether it worked.
+
+    to_feather creates the file before converting the frame, so a failed
+    conversion (e.g. a mixed int/str column) would leave a truncated file
+    behind. Writing to a temporary name and renaming means path only ever
+    holds a complete file.
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        df.reset_index(drop=True).to_feather(tmp)
+        os.replace(tmp, path)
+        return True
+    except (pa.ArrowException, OSError, TypeError, ValueError):
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return False
+
+
+def write_lookup(result: pd.DataFrame, output_file: str, sheet_name: str):
+    """
+    Write a lookup table to Excel plus a Feather sidecar for Script 4.
+
+    The workbook is streamed row by row (xlsxwriter constant_memory), so no
+    in-memory OOXML tree is built; column widths are sized up front from the
+    data.
+    """
+    # constant_memory flushes each row as soon as the next one starts, so rows
+    # must be written in order – pandas' to_excel writes column by column.
+    wb = xlsxwriter.Workbook(output_file, {"constant_memory": True})
+    ws = wb.add_worksheet(sheet_name)
+    header_fmt = wb.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    for i, col in enumerate(result.columns):
+        header_len = max(len(line) for line in str(col).splitlines())
+        value_len = result[col].astype(str).str.len().max() if len(result) else 0
+        ws.set_column(i, i, min(max(header_len, value_len) + 2, 45))
+    ws.write_row(0, 0, result.columns, header_fmt)
+    for r, row in enumerate(result.itertuples(index=False, name=None), start=1):
+        ws.write_row(r, 0, row)
+    wb.close()
+
+    sidecar = sidecar_path(output_file)
+    if not _write_feather(result, sidecar):
+        # e.g. a mixed int/str code column – drop any older copy so Script 4
+        # reads the xlsx
+        try:
+            os.remove(sidecar)
+        except OSError:
+            pass
+
+
+def read_lookup(filepath: str, sheet_name: str) -> pd.DataFrame:
+    """Read a lookup written by write_lookup, preferring its Feather sidecar."""
+    sidecar = sidecar_path(filepath)
+    if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(filepath):
+        try:
+            return pd.read_feather(sidecar)
+        except (pa.ArrowException, OSError):
+            pass  # e.g. truncated by an older build – the workbook is the source
+    return pd.read_excel(filepath, sheet_name=sheet_name, engine=EXCEL_ENGINE)
+
+
+# Part of every cached_frame key. Bump it whenever the parsing or the results
+# the cached frames hold change (null markers, columns, dtypes, inventory
+# maths), so frames cached by an older build are never reused.
+CACHE_VERSION = 2
+
+
+def cached_frame(input_file, tag: str, load, log_fn=print, key_extra: str = "",
+                 **read_kwargs) -> pd.DataFrame:
+    """
+    Return load(), cached as Feather in the temp dir until input_file changes.
+
+    The cache file is keyed by CACHE_VERSION and the inputs' absolute paths,
+    mtimes and sizes, so re-running a script on unchanged reports skips parsing them. Older
+    cache files for the same inputs are removed when a new one is written.
+
+    Args:
+        input_file:  Report the frame is parsed from, or a list of them
+        tag:         Distinguishes caches of the same file made by different scripts
+        load:        Zero-argument callable that parses input_file
+        log_fn:      Callable for progress messages
+        key_extra:   Anything else the result depends on (e.g. today's date)
+        read_kwargs: Passed to pd.read_feather on a cache hit (e.g. dtype_backend)
+    """
+    files = [input_file] if isinstance(input_file, str) else list(input_file)
+    paths = "|".join(os.path.abspath(f) for f in files)
+    path_key = hashlib.sha1(paths.encode()).hexdigest()[:16]
+    prefix = os.path.join(tempfile.gettempdir(), f"hpim_{tag}_{path_key}_")
+    if len(files) == 1 and not key_extra:
+        stat = os.stat(input_file)
+        cache = f"{prefix}v{CACHE_VERSION}_{stat.st_mtime_ns}_{stat.st_size}.feather"
+    else:
+        stamps = [f"{st.st_mtime_ns}_{st.st_size}" for st in map(os.stat, files)]
+        state_key = hashlib.sha1("|".join(stamps + [key_extra]).encode()).hexdigest()[:16]
+        cache = f"{prefix}v{CACHE_VERSION}_{state_key}.feather"
+
+    if os.path.exists(cache):
+        try:
+            df = pd.read_feather(cache, **read_kwargs)
+            log_fn("  Input unchanged since last run – using cached copy")
+            return df
+        except (pa.ArrowException, OSError):
+            pass  # unreadable (e.g. truncated) – parse again and replace it
+
+    df = load()
+    # Same prefix, so this also clears caches written by older versions
+    for stale in glob.glob(glob.escape(prefix) + "*.feather"):
+        try:
+            os.remove(stale)
+        except OSError:
+            pass
+    _write_feather(df, cache)  # e.g. mixed-type columns fail – just parse again next time
+    return df
+
+
+# CSVs at least this big are processed block by block instead of loaded whole
+STREAM_MIN_BYTES   = 512 * 1024 * 1024
+STREAM_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def csv_text_blocks(input_file: str, columns, null_values=None):
+    """
+    Iterate over a large CSV as pyarrow RecordBatches of STREAM_BLOCK_BYTES.
+
+    Only columns are parsed, all as (nullable) strings: Arrow's streaming
+    type inference would only see the first block, so callers convert the
+    numeric columns themselves, block by block.
+
+    Args:
+        input_file:  CSV to read
+        columns:     Column names to parse
+        null_values: Strings read as null (pyarrow's defaults if None)
+    """
+    convert = dict(
+        include_columns=columns,
+        column_types={c: pa.string() for c in columns},
+        strings_can_be_null=True,
+    )
+    if null_values is not None:
+        convert["null_values"] = null_values
+    return pacsv.open_csv(
+        input_file,
+        read_options=pacsv.ReadOptions(use_threads=True, block_size=STREAM_BLOCK_BYTES),
+        convert_options=pacsv.ConvertOptions(**convert),
+    )
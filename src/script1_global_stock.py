@@ -3,9 +3,81 @@ Script 1: Global Stock Lookup Generator
 Hospital Pharmacy Inventory Management
 """
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pacsv
 import os
 
+from ._agg import category_sums, combine_block_totals
+from ._lookup_io import STREAM_MIN_BYTES, cached_frame, csv_text_blocks, write_lookup
+
+
+REQUIRED_COLS = ["ItemCode", "Description", "Qty"]
+# pandas' default NA markers: pyarrow's defaults plus "None" and "<NA>"
+NULL_VALUES   = pacsv.ConvertOptions().null_values + ["None", "<NA>"]
+
+
+def _read_report(input_file: str) -> pd.DataFrame:
+    """Read the three used columns of the report into Arrow-backed columns."""
+    # Arrow tokenises 1 MB blocks on all cores and parses only the three
+    # columns we use straight into Arrow buffers (no Python str objects)
+    table = pacsv.read_csv(
+        input_file,
+        read_options=pacsv.ReadOptions(use_threads=True, block_size=1 << 20),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=REQUIRED_COLS,
+            column_types={"Description": pa.string()},
+            null_values=NULL_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def _clean(df: pd.DataFrame):
+    """
+    Apply the three clean-up filters as masks and a single selection.
+
+    Returns the kept rows and the (blank Description, blank Qty, non-numeric
+    Qty) removal counts, each counted in filter order.
+    """
+    desc = df["Description"]
+    qty  = pd.to_numeric(df["Qty"], errors="coerce").astype("float64")
+    desc_ok     = desc.str.strip().str.len().fillna(0) > 0  # Arrow kernels, no str objects
+    qty_present = df["Qty"].notna()
+    qty_ok      = qty.notna()
+
+    removed = np.array([
+        (~desc_ok).sum(),                          # Filter 1 – blank Description
+        (desc_ok & ~qty_present).sum(),            # Filter 2 – blank Qty
+        (desc_ok & qty_present & ~qty_ok).sum(),   # Filter 3 – non-numeric Qty
+    ])
+    keep = desc_ok & qty_ok
+    return df.loc[keep].assign(Qty=qty[keep].to_numpy()), removed
+
+
+def _fold_blocks(input_file: str):
+    """
+    Clean and aggregate a very large report one block at a time.
+
+    Only the current block and the per-item totals are in memory, so peak RAM
+    no longer scales with the file. Returns (rows read, rows kept, removal
+    counts, per-item totals).
+    """
+    n_rows = n_kept = 0
+    removed = np.zeros(3, dtype=np.int64)
+    partials = []
+    for batch in csv_text_blocks(input_file, REQUIRED_COLS, NULL_VALUES):
+        df = batch.to_pandas(types_mapper=pd.ArrowDtype)
+        df["ItemCode"] = df["ItemCode"].astype("category")
+        kept, batch_removed = _clean(df)   # Qty goes through pd.to_numeric here
+        n_rows  += len(df)
+        n_kept  += len(kept)
+        removed += batch_removed
+        partials.append(category_sums(kept["ItemCode"], kept["Qty"].to_numpy()))
+    return n_rows, n_kept, removed, combine_block_totals(partials)
+
 
 def create_global_stock_lookup(input_file: str, output_file: str, log_fn=print) -> pd.DataFrame:
     """
@@ -25,57 +97,65 @@ def create_global_stock_lookup(input_file: str, output_file: str, log_fn=print)
         raise FileNotFoundError(f"Input file not found: {input_file}")
 
     log_fn("Loading input file…")
-    df = pd.read_csv(input_file, encoding="utf-8")
-    log_fn(f"  Loaded {len(df):,} rows")
-
-    required_cols = ["ItemCode", "Description", "Qty"]
-    missing = [c for c in required_cols if c not in df.columns]
+    header = pd.read_csv(input_file, encoding="utf-8", nrows=0).columns
+    missing = [c for c in REQUIRED_COLS if c not in header]
     if missing:
         raise ValueError(f"Input file missing columns: {missing}")
 
-    if len(df) == 0:
+    streamed = os.path.getsize(input_file) >= STREAM_MIN_BYTES
+    if streamed:
+        log_fn("  Large report – cleaning and aggregating block by block…")
+        n_rows, n_kept, removed, totals = _fold_blocks(input_file)
+    else:
+        df = cached_frame(input_file, "global_stock", lambda: _read_report(input_file),
+                          log_fn, dtype_backend="pyarrow")
+        n_rows = len(df)
+    log_fn(f"  Loaded {n_rows:,} rows")
+
+    if n_rows == 0:
         raise ValueError("Input file is empty")
 
     # ── Step 2: Clean ────────────────────────────────────────────────────────────
     log_fn("\nCleaning data…")
-
-    # Filter 1 – remove blank Description
-    before = len(df)
-    df = df[df["Description"].notna() & (df["Description"].astype(str).str.strip() != "")]
-    log_fn(f"  Removed {before - len(df):,} rows with blank Description")
-
-    # Filter 2 – remove blank Qty
-    before = len(df)
-    df = df[df["Qty"].notna()]
-    log_fn(f"  Removed {before - len(df):,} rows with blank Qty")
-
-    # Filter 3 – convert Qty to numeric
-    df["Qty"] = pd.to_numeric(df["Qty"], errors="coerce")
-    before = len(df)
-    df = df[df["Qty"].notna()]
-    removed = before - len(df)
-    if removed:
-        log_fn(f"  Removed {removed:,} rows with non-numeric Qty")
-
-    if len(df) == 0:
+    if not streamed:
+        # Item codes repeat heavily – keep them as integer category codes from here on
+        df["ItemCode"] = df["ItemCode"].astype("category")
+        df, removed = _clean(df)
+        n_kept = len(df)
+
+    log_fn(f"  Removed {removed[0]:,} rows with blank Description")
+    log_fn(f"  Removed {removed[1]:,} rows with blank Qty")
+    if removed[2]:
+        log_fn(f"  Removed {removed[2]:,} rows with non-numeric Qty")
+
+    if n_kept == 0:
         raise ValueError("All rows were filtered out – check input data")
 
     # ── Step 3: Aggregate ────────────────────────────────────────────────────────
     log_fn("\nAggregating…")
-    result = df.groupby("ItemCode")["Qty"].sum().reset_index()
-    result.columns = ["Item Code", "Total Global Stock"]
-    result = result.sort_values("Item Code").reset_index(drop=True)
-    log_fn(f"  {len(df):,} rows → {len(result):,} unique items")
+    if not streamed:
+        # Rows without an ItemCode are skipped, as groupby did
+        totals = category_sums(df["ItemCode"], df["Qty"].to_numpy())
+    result = pd.DataFrame({"Item Code": totals.index, "Total Global Stock": totals.to_numpy()})
+    log_fn(f"  {n_kept:,} rows → {len(result):,} unique items")
 
     # ── Step 4: Validate ─────────────────────────────────────────────────────────
-    assert "Intransit Store" not in result["Item Code"].values, "Intransit Store should be removed"
+    # Item codes come out sorted, so a binary search replaces the linear scan
+    # (numeric codes can't hold the sentinel at all)
+    codes = result["Item Code"]
+    if pd.api.types.is_string_dtype(codes.dtype):
+        idx = codes.searchsorted("Intransit Store")
+        assert idx == len(codes) or codes.iat[idx] != "Intransit Store", "Intransit Store should be removed"
+    # Only scans the grouped rows, not the input
     assert result["Item Code"].is_unique, "Duplicate item codes found"
-    assert (result["Total Global Stock"] >= 0).all(), "Negative quantities found"
-    assert result["Total Global Stock"].notna().all(), "Null quantities found"
+    # min() propagates NaN, so one pass covers the null and negative checks
+    lowest = result["Total Global Stock"].to_numpy().min(initial=0.0)
+    assert not np.isnan(lowest), "Null quantities found"
+    assert lowest >= 0, "Negative quantities found"
 
     # ── Step 5: Export ───────────────────────────────────────────────────────────
     log_fn(f"\nExporting to {output_file}…")
-    result.to_excel(output_file, sheet_name="output", index=False)
+    write_lookup(result, output_file, sheet_name="output")
 
     log_fn("\n" + "=" * 55)
     log_fn("GLOBAL STOCK LOOKUP – COMPLETE")
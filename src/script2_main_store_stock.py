@@ -3,9 +3,13 @@ Script 2: Main Store Stock Lookup Generator
 Hospital Pharmacy Inventory Management
 """
 
+import numpy as np
 import pandas as pd
 import os
 
+from ._agg import category_sums, store_equals
+from ._lookup_io import EXCEL_ENGINE, cached_frame, write_lookup
+
 
 def create_main_store_stock_lookup(input_file: str, output_file: str, log_fn=print) -> pd.DataFrame:
     """
@@ -29,75 +33,97 @@ def create_main_store_stock_lookup(input_file: str, output_file: str, log_fn=pri
         raise FileNotFoundError(f"Input file not found: {input_file}")
 
     log_fn("Loading input file…")
-    if input_file.lower().endswith(".csv"):
-        df = pd.read_csv(input_file)
-    else:
-        xl = pd.ExcelFile(input_file)
+    required = [ITEM_COL, QTY_COL, "Store Name"]
+    is_csv = input_file.lower().endswith(".csv")
+
+    def load():
+        # Parse the sheet once, keeping only the columns we aggregate on
+        if is_csv:
+            return pd.read_csv(input_file, usecols=lambda c: c in required)
+        xl = pd.ExcelFile(input_file, engine=EXCEL_ENGINE)
         raw_sheet = xl.sheet_names[0]
         log_fn(f"  Using sheet: '{raw_sheet}'")
-        df = pd.read_excel(input_file, sheet_name=raw_sheet)
+        return xl.parse(raw_sheet, usecols=lambda c: c in required)
+
+    df = cached_frame(input_file, "main_store", load, log_fn)
     log_fn(f"  Loaded {len(df):,} rows")
 
     # Check required columns
-    required = [ITEM_COL, QTY_COL, "Store Name"]
     missing = [c for c in required if c not in df.columns]
     if missing:
-        log_fn(f"  Available columns: {df.columns.tolist()}")
+        header = pd.read_csv(input_file, nrows=0) if is_csv else pd.read_excel(input_file, nrows=0, engine=EXCEL_ENGINE)
+        log_fn(f"  Available columns: {header.columns.tolist()}")
         raise ValueError(f"Missing columns: {missing}")
 
     if len(df) == 0:
         raise ValueError("Input sheet is empty")
 
+    # Item codes repeat once per batch – keep them as integer category codes
+    df[ITEM_COL] = df[ITEM_COL].astype("category")
+
     # ── Step 2: Quality checks ───────────────────────────────────────────────────
     log_fn("\nVerifying data quality…")
 
+    # Store, missing-data and numeric checks are computed as masks and applied
+    # in one selection; the log counters are popcounts of those masks.
+    store_mask = store_equals(df["Store Name"], MAIN_STORE)
+    item_na    = df[ITEM_COL].isna().to_numpy()
+    qty        = pd.to_numeric(df[QTY_COL], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    qty_bad    = np.isnan(qty)
+    # Blank and non-numeric only differ for a text column; a numeric one is
+    # already NaN exactly where it is blank
+    qty_na     = qty_bad if pd.api.types.is_numeric_dtype(df[QTY_COL]) else df[QTY_COL].isna().to_numpy()
+
     # Store name check
-    main_rows = (df["Store Name"] == MAIN_STORE).sum()
+    main_rows = store_mask.sum()
     log_fn(f"  Main Medical Store rows: {main_rows:,} / {len(df):,}")
     if main_rows != len(df):
         log_fn(f"  WARNING: {len(df) - main_rows:,} rows from other stores – filtering…")
-        df = df[df["Store Name"] == MAIN_STORE]
 
     # Missing data check
-    missing_items = df[ITEM_COL].isna().sum()
-    missing_qty   = df[QTY_COL].isna().sum()
+    missing_items = (store_mask & item_na).sum()
+    missing_qty   = (store_mask & qty_na).sum()
     log_fn(f"  Missing Item Codes : {missing_items}")
     log_fn(f"  Missing Quantities : {missing_qty}")
     if missing_items > 0 or missing_qty > 0:
         log_fn("  Removing rows with missing data…")
-        df = df[df[ITEM_COL].notna() & df[QTY_COL].notna()]
 
-    # Convert qty to numeric
-    df[QTY_COL] = pd.to_numeric(df[QTY_COL], errors="coerce")
-    df = df[df[QTY_COL].notna()]
+    # Keep Main Store rows with an item code and a numeric qty
+    keep = store_mask & ~item_na & ~qty_bad
+    non_numeric = (store_mask & ~item_na & qty_bad & ~qty_na).sum()
+    if non_numeric:
+        log_fn(f"  Removed {non_numeric:,} rows with non-numeric Qty")
+    qty = qty[keep]
+    df = pd.DataFrame({ITEM_COL: df[ITEM_COL].array[keep], QTY_COL: qty})
 
     # ── Step 3: Aggregate ────────────────────────────────────────────────────────
     log_fn("\nAggregating by Item Code…")
-    input_total = df[QTY_COL].sum()
-    result = df.groupby(ITEM_COL)[QTY_COL].sum().reset_index()
-    result.columns = [ITEM_COL, "Sum of Qty."]
-    result = result.sort_values(ITEM_COL).reset_index(drop=True)
+    input_total = qty.sum(dtype=np.float64)
+    totals = category_sums(df[ITEM_COL], qty)
+    result = pd.DataFrame({ITEM_COL: totals.index, "Sum of Qty.": totals.to_numpy()})
     log_fn(f"  {len(df):,} batch records → {len(result):,} unique items")
 
     # ── Step 4: Validate ─────────────────────────────────────────────────────────
     assert result[ITEM_COL].is_unique, "Duplicate item codes found"
-    assert (result["Sum of Qty."] >= 0).all(), "Negative quantities found"
-    assert result["Sum of Qty."].notna().all(), "Null quantities found"
-    output_total = result["Sum of Qty."].sum()
+    # A NaN total would surface as the minimum
+    lowest = result["Sum of Qty."].to_numpy().min(initial=0.0)
+    assert not np.isnan(lowest), "Null quantities found"
+    assert lowest >= 0, "Negative quantities found"
+    output_total = totals.sum()  # ngroups-long, not a second pass over the batches
     assert abs(input_total - output_total) < 0.01, \
         f"Quantity mismatch: input={input_total}, output={output_total}"
     log_fn(f"  ✓ Quantity conservation: {output_total:,.2f}")
 
     # ── Step 5: Export ───────────────────────────────────────────────────────────
     log_fn(f"\nExporting to {output_file}…")
-    result.to_excel(output_file, sheet_name="OUTPUT", index=False)
+    write_lookup(result, output_file, sheet_name="OUTPUT")
 
     log_fn("\n" + "=" * 55)
     log_fn("MAIN STORE STOCK LOOKUP – COMPLETE")
     log_fn("=" * 55)
     log_fn(f"  Input batches      : {len(df):,}")
     log_fn(f"  Unique items       : {len(result):,}")
-    log_fn(f"  Total stock qty    : {result['Sum of Qty.'].sum():,.2f}")
+    log_fn(f"  Total stock qty    : {output_total:,.2f}")
     log_fn(f"  Output file        : {output_file}")
     log_fn("=" * 55)
 
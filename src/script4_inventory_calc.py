@@ -3,24 +3,86 @@ Script 4: Inventory Calculation Sheet Generator
 Hospital Pharmacy Inventory Management
 """
 
-import math
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 
+import numpy as np
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils import get_column_letter
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from ._agg import PARALLEL_MIN_ROWS, category_sums, combine_block_totals, store_equals
+from ._lookup_io import EXCEL_ENGINE, STREAM_MIN_BYTES, cached_frame, csv_text_blocks, read_lookup
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional – the NumPy path is used instead
+    njit = None
+
+
+def _metrics_numpy(gs, pp, ms, adc, min_lvl, max_lvl, pack, current):
+    """
+    Columns R–V from the float64 input columns.
+
+    Returns (Net Stock, Global Stock Days, Main Store Stock Days,
+    Reorder Needed?, Order Qty) as arrays.
+    """
+    net = gs + pp
+
+    # Stock days are 0 where there is no consumption; dividing by 1 there
+    # keeps the vectorised division free of divide-by-zero warnings
+    has_adc = adc > 0
+    safe_adc = np.where(has_adc, adc, 1.0)
+    gs_days = np.where(has_adc, np.round(gs / safe_adc), 0.0)
+    ms_days = np.where(has_adc, np.round(ms / safe_adc), 0.0)
+
+    reorder = current & (net < min_lvl)
+
+    # Order Qty: shortage rounded up to whole packs, for current SKUs that
+    # need a reorder and have a positive pack/shortage
+    shortage = max_lvl - net
+    safe_pack = np.where(pack > 0, pack, 1.0)
+    eligible = current & reorder & (pack > 0) & (shortage > 0)
+    order_qty = np.where(eligible, np.ceil(shortage / safe_pack) * pack, 0.0)
+    return net, gs_days, ms_days, reorder, order_qty
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _metrics_parallel(gs, pp, ms, adc, min_lvl, max_lvl, pack, current):
+        # Same maths as _metrics_numpy in one fused pass over the inputs
+        # instead of a temporary per operation. No fastmath: it would let
+        # NaN levels compare differently from the NumPy path.
+        n = gs.size
+        net = np.empty(n)
+        gs_days = np.zeros(n)
+        ms_days = np.zeros(n)
+        reorder = np.zeros(n, dtype=np.bool_)
+        order_qty = np.zeros(n)
+        for i in prange(n):
+            net[i] = gs[i] + pp[i]
+            if adc[i] > 0:
+                gs_days[i] = np.round(gs[i] / adc[i])
+                ms_days[i] = np.round(ms[i] / adc[i])
+            reorder[i] = current[i] and net[i] < min_lvl[i]
+            shortage = max_lvl[i] - net[i]
+            if reorder[i] and pack[i] > 0 and shortage > 0:
+                order_qty[i] = np.ceil(shortage / pack[i]) * pack[i]
+        return net, gs_days, ms_days, reorder, order_qty
 
 
 class InventoryCalculator:
     """Generates the complete Inventory Calculation sheet."""
 
     ITEM_COL = "Item\nCode"
+    MAIN_STORE = "Main Medical Store (MMS)-SEPL"
+    PO_COLS = ["Store Name", "Item Code", "POCreated Date", "Pen.Qty"]
+    SKU_FLAGS = {True: True, False: False, "TRUE": True, "FALSE": False}  # 1/0 hash as True/False
 
     def __init__(self, log_fn=print):
         self.log = log_fn
         self.data: pd.DataFrame = None
+        self._unit_cost_col: str = None
 
     # ── Step 1 ────────────────────────────────────────────────────────────────────
     def load_master(self, filepath: str):
@@ -28,11 +90,68 @@ class InventoryCalculator:
             raise FileNotFoundError(f"Master data not found: {filepath}")
 
         self.log("Loading Master Data…")
-        df = pd.read_excel(filepath)
+        df = pd.read_excel(filepath, engine=EXCEL_ENGINE)
         total = len(df)
-        df = df[df["Current SKU (TRUE/FALSE)"] == True].copy()
+        # Resolved once here rather than on every summary; text costs become
+        # blanks so the order value is always a plain numeric dot product
+        self._unit_cost_col = self._unit_cost_column(df.columns)
+        if self._unit_cost_col is not None:
+            df[self._unit_cost_col] = pd.to_numeric(df[self._unit_cost_col], errors="coerce")
+
+        # Excel hands this column over as bools, 1/0 or "TRUE"/"FALSE" text;
+        # normalise it once so every later test is a 1-byte bool op
+        sku = df["Current SKU (TRUE/FALSE)"]
+        if sku.dtype != bool:
+            df["Current SKU (TRUE/FALSE)"] = sku.map(self.SKU_FLAGS).eq(True)  # unmapped → False
+        df = df[df["Current SKU (TRUE/FALSE)"].to_numpy()].copy()
         self.log(f"  {len(df):,} active SKUs (of {total:,} total)")
-        self.data = df
+        # Sort and index by item code once: the lookups come out of Scripts 1/2
+        # and the PO step sorted too, so each alignment below is a sequential
+        # merge of two sorted indexes (the column stays for the export)
+        try:
+            df = df.sort_values(self.ITEM_COL, kind="stable")
+        except TypeError:
+            pass  # mixed int/str codes – the alignment falls back to hashing
+        self.data = df.set_index(self.ITEM_COL, drop=False).rename_axis(None)
+
+    @staticmethod
+    def _unit_cost_column(columns):
+        """First column whose name mentions "unit cost", or None."""
+        return next((c for c in columns if "unit cost" in str(c).lower()), None)
+
+    @staticmethod
+    def _code_kind(index: pd.Index) -> str:
+        """"numeric", "text" or another pandas inferred type for item codes."""
+        kind = pd.api.types.infer_dtype(index, skipna=True)
+        if kind in ("integer", "floating", "mixed-integer-float", "decimal"):
+            return "numeric"
+        return "text" if kind == "string" else kind
+
+    def _aligned(self, values: pd.Series, label: str) -> np.ndarray:
+        """
+        Per-item values lined up with self.data's rows; items not in values get 0.
+
+        Raises ValueError when one side's item codes are all numeric and the
+        other's all text (as the merge this replaced did): nothing could
+        match, and every item would silently read 0.
+        """
+        if len(self.data) and len(values):
+            kinds = self._code_kind(self.data.index), self._code_kind(values.index)
+            if {"numeric", "text"} == set(kinds):
+                raise ValueError(
+                    f"{label}: item codes are {kinds[1]} but the master's are "
+                    f"{kinds[0]} – check the Item Code columns"
+                )
+        # A left join of two monotonic indexes takes pandas' merge-style path
+        # instead of building a hash table; unsorted ones still work via hashing
+        _, _, pos = self.data.index.join(values.index, how="left", return_indexers=True)
+        vals = np.nan_to_num(values.to_numpy(dtype=np.float64, na_value=np.nan), nan=0.0)
+        if pos is None:  # identical indexes
+            return vals
+        if len(vals) and len(pos) and (pos < 0).all():
+            self.log(f"  WARNING: {label}: no item codes match the master – all set to 0")
+        # Missing items come back as -1, which picks the trailing 0 sentinel
+        return np.append(vals, 0.0)[pos]
 
     # ── Step 2 ────────────────────────────────────────────────────────────────────
     def merge_global_stock(self, filepath: str):
@@ -40,16 +159,10 @@ class InventoryCalculator:
             raise FileNotFoundError(f"Global stock lookup not found: {filepath}")
 
         self.log("Merging Global Stock…")
-        gs = pd.read_excel(filepath, sheet_name="output")
-
-        self.data = self.data.merge(
-            gs,
-            left_on=self.ITEM_COL,
-            right_on="Item Code",
-            how="left",
-        )
-        self.data["Global stock"] = self.data["Total Global Stock"].fillna(0)
-        self.data.drop(columns=["Item Code", "Total Global Stock"], inplace=True)
+        gs = read_lookup(filepath, sheet_name="output")
+        stock = gs.set_index("Item Code")["Total Global Stock"]
+
+        self.data["Global stock"] = self._aligned(stock, "Global Stock lookup")
         self.log(f"  Global stock merged – {(self.data['Global stock'] > 0).sum():,} items with stock")
 
     # ── Step 3 ────────────────────────────────────────────────────────────────────
@@ -58,89 +171,124 @@ class InventoryCalculator:
             raise FileNotFoundError(f"Main store lookup not found: {filepath}")
 
         self.log("Merging Main Store Stock…")
-        ms = pd.read_excel(filepath, sheet_name="OUTPUT")
+        ms = read_lookup(filepath, sheet_name="OUTPUT")
+        stock = ms.set_index(self.ITEM_COL)["Sum of Qty."]
 
-        self.data = self.data.merge(ms, on=self.ITEM_COL, how="left")
-        self.data["Main Store Stock"] = self.data["Sum of Qty."].fillna(0)
-        self.data.drop(columns=["Sum of Qty."], inplace=True)
+        self.data["Main Store Stock"] = self._aligned(stock, "Main Store lookup")
         self.log(f"  Main store stock merged – {(self.data['Main Store Stock'] > 0).sum():,} items with stock")
 
     # ── Step 4 ────────────────────────────────────────────────────────────────────
-    def process_pending_po(self, filepath: str):
+    def process_pending_po(self, filepath: str, as_of: date = None):
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Expected items file not found: {filepath}")
 
         self.log("Processing Pending PO…")
+        # The window starts at midnight, so every run on the same day (as_of,
+        # default today) keeps the same PO lines whatever the time of day
+        three_months_ago = datetime.combine(as_of or date.today(), time.min) - timedelta(days=90)
 
-        # Detect CSV vs Excel
+        # Only the four PO columns are parsed; a very large CSV is filtered and
+        # summed block by block so old and other-store lines never pile up
         if filepath.lower().endswith(".csv"):
-            expected = pd.read_csv(filepath)
+            if os.path.getsize(filepath) >= STREAM_MIN_BYTES:
+                n_lines, n_kept, totals = self._fold_po_blocks(filepath, three_months_ago)
+            else:
+                expected = pd.read_csv(filepath, engine="pyarrow", usecols=self.PO_COLS)
+                n_lines = len(expected)
+                n_kept, totals = self._pending_by_item(expected, three_months_ago)
         else:
-            expected = pd.read_excel(filepath)
-
-        self.log(f"  Loaded {len(expected):,} PO lines")
-
-        # Parse date
-        expected["POCreated Date"] = pd.to_datetime(expected["POCreated Date"], errors="coerce")
-        three_months_ago = datetime.now() - timedelta(days=90)
-
-        # Filter
-        expected = expected[expected["Store Name"] == "Main Medical Store (MMS)-SEPL"]
-        expected = expected[expected["POCreated Date"] >= three_months_ago]
-        self.log(f"  {len(expected):,} lines after store + 90-day filter")
-
-        # Aggregate
-        pending = expected.groupby("Item Code")["Pen.Qty"].sum().reset_index()
-        pending.columns = ["Item Code", "Pending PO"]
-
-        self.data = self.data.merge(
-            pending,
-            left_on=self.ITEM_COL,
-            right_on="Item Code",
-            how="left",
-        )
-        self.data["Pending PO"] = self.data["Pending PO"].fillna(0)
-        self.data.drop(columns=["Item Code"], inplace=True)
+            expected = pd.read_excel(filepath, engine=EXCEL_ENGINE, usecols=self.PO_COLS)
+            n_lines = len(expected)
+            n_kept, totals = self._pending_by_item(expected, three_months_ago)
+
+        self.log(f"  Loaded {n_lines:,} PO lines")
+        self.log(f"  {n_kept:,} lines after store + 90-day filter")
+
+        self.data["Pending PO"] = self._aligned(totals, "Pending PO")
         self.log(f"  Pending PO merged – {(self.data['Pending PO'] > 0).sum():,} items with pending orders")
 
+    def _pending_by_item(self, expected: pd.DataFrame, cutoff: datetime, store_filtered: bool = False):
+        """
+        Return (lines kept, Pen.Qty per Item Code) for recent Main Store PO lines.
+
+        store_filtered skips the store test for lines already narrowed to the
+        Main Store upstream.
+        """
+        keep = (self._po_dates(expected["POCreated Date"]) >= cutoff).to_numpy()
+        if not store_filtered:
+            keep = keep & store_equals(expected["Store Name"], self.MAIN_STORE)
+
+        # Item codes repeat on every line – group on their integer category codes
+        items = expected.loc[keep, "Item Code"].astype("category")
+        qty   = expected["Pen.Qty"].to_numpy(dtype=np.float64, na_value=np.nan)[keep]
+        # Blank Pen.Qty counts as 0, as groupby().sum() did
+        return int(keep.sum()), category_sums(items, np.nan_to_num(qty, nan=0.0))
+
+    @staticmethod
+    def _po_dates(col: pd.Series) -> pd.Series:
+        """Parse POCreated Date, taking the fast paths when the format allows."""
+        # The pyarrow CSV engine and calamine usually hand dates over parsed
+        if pd.api.types.is_datetime64_any_dtype(col.dtype):
+            return col
+        # ERP exports are ISO-like; the ISO8601 parser is a single C pass. Only
+        # if it rejects values does pandas' format inference get a turn.
+        dates = pd.to_datetime(col, format="ISO8601", errors="coerce")
+        if (dates.isna() & col.notna()).any():
+            dates = pd.to_datetime(col, errors="coerce")
+        return dates
+
+    def _fold_po_blocks(self, filepath: str, cutoff: datetime):
+        """
+        Filter and aggregate a very large PO CSV one block at a time.
+
+        Returns (lines read, lines kept, Pen.Qty per Item Code); only the
+        current block and the per-block totals are held in memory.
+        """
+        n_lines = n_kept = 0
+        partials = []
+        for batch in csv_text_blocks(filepath, self.PO_COLS):
+            n_lines += batch.num_rows
+            # Push the store filter down into Arrow so other stores' lines are
+            # never converted to pandas (nulls compare as null → dropped)
+            batch = batch.filter(pc.equal(batch.column("Store Name"), self.MAIN_STORE))
+            block = batch.to_pandas()
+            block["Pen.Qty"] = pd.to_numeric(block["Pen.Qty"], errors="coerce")  # read as text
+            kept, block_totals = self._pending_by_item(block, cutoff, store_filtered=True)
+            n_kept  += kept
+            partials.append(block_totals)
+        return n_lines, n_kept, combine_block_totals(partials)
+
     # ── Step 5-9 ──────────────────────────────────────────────────────────────────
     def calculate_metrics(self):
         self.log("Calculating inventory metrics…")
         df = self.data
 
-        # Column R – Net Stock
-        df["Net Stock"] = df["Global stock"] + df["Pending PO"]
-
-        # Column S – Global Stock Days
-        df["Global Stock Days"] = df.apply(
-            lambda r: round(r["Global stock"] / r["ADC"], 0) if r["ADC"] > 0 else 0,
-            axis=1,
-        )
-
-        # Column T – Main Store Stock Days
-        df["Main Store Stock Days"] = df.apply(
-            lambda r: round(r["Main Store Stock"] / r["ADC"], 0) if r["ADC"] > 0 else 0,
-            axis=1,
-        )
-
-        # Column U – Reorder Needed?
-        df["Reorder Needed?"] = (
-            (df["Current SKU (TRUE/FALSE)"] == True)
-            & (df["Net Stock"] < df["Min Stock Level"])
-        )
-
-        # Column V – Order Qty
-        def calc_order_qty(row):
-            if not row["Current SKU (TRUE/FALSE)"] or not row["Reorder Needed?"]:
-                return 0
-            shortage = row["Max Stock Level"] - row["Net Stock"]
-            pack = row["Pack size"]
-            if pack <= 0 or shortage <= 0:
-                return 0
-            return max(0, math.ceil(shortage / pack) * pack)
-
-        df["Order Qty"] = df.apply(calc_order_qty, axis=1)
-        self.data = df
+        cols = {
+            name: df[name].to_numpy(dtype=np.float64)
+            for name in ("Global stock", "Pending PO", "Main Store Stock", "ADC",
+                         "Min Stock Level", "Max Stock Level", "Pack size")
+        }
+        current = df["Current SKU (TRUE/FALSE)"].to_numpy(dtype=bool)
+        if njit is not None and len(df) >= PARALLEL_MIN_ROWS:
+            net, gs_days, ms_days, reorder, order_qty = _metrics_parallel(*cols.values(), current)
+        else:
+            net, gs_days, ms_days, reorder, order_qty = _metrics_numpy(*cols.values(), current)
+
+        # The five new columns are attached in one concat rather than five
+        # separate insertions into the frame
+        metrics = pd.DataFrame({
+            "Net Stock":             net,       # Column R
+            "Global Stock Days":     gs_days,   # Column S
+            "Main Store Stock Days": ms_days,   # Column T
+            "Reorder Needed?":       reorder,   # Column U
+            # Column V – whole pack sizes give whole quantities; keep fractional packs as-is
+            "Order Qty": order_qty.astype(np.int64) if (order_qty % 1 == 0).all() else order_qty,
+        }, index=df.index)
+        if metrics.columns.intersection(df.columns).empty:
+            self.data = pd.concat([df, metrics], axis=1)
+        else:  # master already carries (stale) R–V columns – overwrite them in place
+            df[metrics.columns] = metrics
+            self.data = df
 
     # ── Validate ──────────────────────────────────────────────────────────────────
     def validate(self):
@@ -152,82 +300,110 @@ class InventoryCalculator:
             self.log(f"  WARNING: Expected {expected_cols} columns, got {len(df.columns)}")
             self.log(f"  Columns: {df.columns.tolist()}")
 
-        net_ok = (df["Net Stock"] == df["Global stock"] + df["Pending PO"]).all()
-        assert net_ok, "Net Stock calculation error"
-        assert (df["Order Qty"] >= 0).all(), "Negative order quantities found"
+        # Checked on the raw float64 arrays (no copies, no intermediate Series);
+        # Net Stock was summed the same way, so the re-sum must match exactly
+        gs = df["Global stock"].to_numpy(dtype=np.float64)
+        pp = df["Pending PO"].to_numpy(dtype=np.float64)
+        ns = df["Net Stock"].to_numpy(dtype=np.float64)
+        assert np.array_equal(ns, gs + pp), "Net Stock calculation error"
+        assert df["Order Qty"].to_numpy().min(initial=0) >= 0, "Negative order quantities found"
         self.log("  ✓ All validations passed")
 
     # ── Export ────────────────────────────────────────────────────────────────────
-    def export(self, output_file: str):
-        self.log(f"\nExporting to {output_file}…")
+    def _export_order(self) -> np.ndarray:
+        """Row order for the sheet: reorder items first, then Order Qty descending."""
+        reorder = self.data["Reorder Needed?"].to_numpy(dtype=np.int64)
+        order_qty = self.data["Order Qty"].to_numpy()
+        # Whole quantities pack into one int64 key under the reorder flag, so a
+        # single stable argsort replaces the two-column sort; ties keep row order
+        if order_qty.dtype.kind in "iu" and order_qty.max(initial=0) < 2**62:
+            key = (reorder << 62) | order_qty.astype(np.int64)
+            return np.argsort(-key, kind="stable")
+        return np.lexsort((-order_qty, -reorder))  # fractional packs
+
+    def export(self, output_file: str, with_excel: bool = True):
+        """
+        Write the sheet as zstd Parquet next to output_file, plus the formatted
+        workbook itself unless with_excel is False.
+
+        The Parquet copy is what downstream tools should read – it writes and
+        loads far faster than the styled xlsx, which is for people.
+        """
+        parquet_file = os.path.splitext(output_file)[0] + ".parquet"
+        self.log(f"\nExporting to {output_file if with_excel else parquet_file}…")
 
         # Sort: reorder items first, then by order qty desc
-        df = self.data.sort_values(
-            ["Reorder Needed?", "Order Qty"],
-            ascending=[False, False],
-        ).reset_index(drop=True)
+        df = self.data.take(self._export_order()).reset_index(drop=True)
+
+        try:
+            df.to_parquet(parquet_file, compression="zstd", index=False)
+        except (pa.ArrowException, TypeError, ValueError):
+            # Never leave the previous run's copy next to the new workbook
+            try:
+                os.remove(parquet_file)
+            except OSError:
+                pass
+            if not with_excel:
+                raise
+            # e.g. a mixed int/str master column – the workbook still goes out
+            self.log("  (Parquet copy skipped – mixed-type column)")
+        if not with_excel:
+            self.log("  ✓ Export complete")
+            return
 
         sheet_name = "Inventory Calculation"
-        df.to_excel(output_file, sheet_name=sheet_name, index=False)
-
-        # ── Formatting ────────────────────────────────────────────────────────────
-        wb = load_workbook(output_file)
-        ws = wb[sheet_name]
-
-        # Freeze header row
-        ws.freeze_panes = "A2"
-
-        # Auto-filter
-        ws.auto_filter.ref = ws.dimensions
-
-        # Header style
-        header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-        header_font = Font(color="FFFFFF", bold=True)
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(wrap_text=True, horizontal="center", vertical="center")
-        ws.row_dimensions[1].height = 30
-
-        # Highlight Reorder Needed column (U)
-        reorder_col = None
-        for col in ws.iter_cols(1, ws.max_column, 1, 1):
-            if col[0].value == "Reorder Needed?":
-                reorder_col = col[0].column
-                break
-
-        if reorder_col:
-            red_fill   = PatternFill(start_color="FFD7D7", end_color="FFD7D7", fill_type="solid")
-            green_fill = PatternFill(start_color="D7FFD7", end_color="D7FFD7", fill_type="solid")
-            for row in ws.iter_rows(2, ws.max_row, reorder_col, reorder_col):
-                cell = row[0]
-                cell.fill = red_fill if cell.value else green_fill
-
-        # Column widths
-        for col in ws.columns:
-            max_len = 0
-            col_letter = get_column_letter(col[0].column)
-            for cell in col:
-                try:
-                    val_len = len(str(cell.value)) if cell.value is not None else 0
-                    max_len = max(max_len, val_len)
-                except Exception:
-                    pass
-            ws.column_dimensions[col_letter].width = min(max_len + 2, 45)
-
-        wb.save(output_file)
+        n_rows, n_cols = df.shape
+
+        # Data and formatting go out in one xlsxwriter pass – no write, re-open
+        # and re-save round trip through openpyxl
+        with pd.ExcelWriter(output_file, engine="xlsxwriter") as writer:
+            df.to_excel(writer, sheet_name=sheet_name, index=False, header=False, startrow=1)
+            wb = writer.book
+            ws = writer.sheets[sheet_name]
+
+            # Freeze header row
+            ws.freeze_panes(1, 0)
+
+            # Auto-filter
+            ws.autofilter(0, 0, n_rows, n_cols - 1)
+
+            # Header style (written by hand – pandas' own header format would
+            # override a row format)
+            header_fmt = wb.add_format({
+                "bg_color": "#1F4E79", "font_color": "#FFFFFF", "bold": True,
+                "text_wrap": True, "align": "center", "valign": "vcenter",
+            })
+            ws.write_row(0, 0, df.columns, header_fmt)
+            ws.set_row(0, 30)
+
+            # Highlight Reorder Needed column (U)
+            if "Reorder Needed?" in df.columns and n_rows:
+                reorder_col = df.columns.get_loc("Reorder Needed?")
+                red_fmt   = wb.add_format({"bg_color": "#FFD7D7"})
+                green_fmt = wb.add_format({"bg_color": "#D7FFD7"})
+                for value, fmt in ((True, red_fmt), (False, green_fmt)):
+                    ws.conditional_format(1, reorder_col, n_rows, reorder_col, {
+                        "type": "cell", "criteria": "==", "value": value, "format": fmt,
+                    })
+
+            # Column widths – one vectorised str.len() per column; blanks don't count
+            for i, col in enumerate(df.columns):
+                value_len = df[col].dropna().astype(str).str.len().max()
+                max_len = max(len(str(col)), 0 if pd.isna(value_len) else int(value_len))
+                ws.set_column(i, i, min(max_len + 2, 45))
+
         self.log(f"  ✓ Export complete with formatting")
 
     # ── Summary ───────────────────────────────────────────────────────────────────
     def print_summary(self):
         df = self.data
-        unit_cost_col = next(
-            (c for c in df.columns if "unit cost" in c.lower()), None
-        )
-        order_value = (
-            (df["Order Qty"] * df[unit_cost_col]).sum()
-            if unit_cost_col else 0
-        )
+        order_value = 0.0
+        if self._unit_cost_col:
+            # BLAS dot product – no N-long product array; blank costs count as 0
+            cost = df[self._unit_cost_col].to_numpy(dtype=np.float64)
+            if np.isnan(cost).any():
+                cost = np.nan_to_num(cost, nan=0.0)
+            order_value = float(np.dot(df["Order Qty"].to_numpy(dtype=np.float64), cost))
 
         self.log("\n" + "=" * 55)
         self.log("INVENTORY CALCULATION – SUMMARY")
@@ -248,14 +424,30 @@ class InventoryCalculator:
         main_store_file: str,
         expected_items_file: str,
         output_file: str,
+        with_excel: bool = True,
     ):
-        self.load_master(master_file)
-        self.merge_global_stock(global_stock_file)
-        self.merge_main_store_stock(main_store_file)
-        self.process_pending_po(expected_items_file)
-        self.calculate_metrics()
-        self.validate()
-        self.export(output_file)
+        inputs = [master_file, global_stock_file, main_store_file, expected_items_file]
+        today = date.today()  # one date for both the PO window and the cache key
+
+        def compute():
+            self.load_master(master_file)
+            self.merge_global_stock(global_stock_file)
+            self.merge_main_store_stock(main_store_file)
+            self.process_pending_po(expected_items_file, as_of=today)
+            self.calculate_metrics()
+            self.validate()
+            return self.data
+
+        if all(map(os.path.exists, inputs)):
+            # Unchanged inputs on the same day give the same sheet (the PO
+            # window starts at midnight 90 days back), so reuse the last result
+            self.data = cached_frame(inputs, "inventory", compute, self.log,
+                                     key_extra=today.isoformat())
+            self._unit_cost_col = self._unit_cost_column(self.data.columns)
+        else:
+            compute()  # the step whose file is missing reports it
+
+        self.export(output_file, with_excel)
         self.print_summary()
         return self.data
 
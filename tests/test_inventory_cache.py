@@ -0,0 +1,84 @@
+"""
+Regression check: Script 4 must survive re-running on unchanged inputs
+when its result cannot be cached as Feather.
+Hospital Pharmacy Inventory Management
+
+Run with:  python -m unittest discover tests
+"""
+
+import glob
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from src._lookup_io import write_lookup
+from src.script4_inventory_calc import InventoryCalculator
+
+
+class InventoryCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = self._tmp.name
+        # Keep cached_frame's hpim_* files inside the test directory
+        self._tempdir, tempfile.tempdir = tempfile.tempdir, self.dir
+
+    def tearDown(self):
+        tempfile.tempdir = self._tempdir
+        self._tmp.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.dir, name)
+
+    def _write_inputs(self):
+        master = pd.DataFrame({
+            "Item\nCode":               ["M001", "M002", "M003"],
+            "Item Name":                ["a", "b", "c"],
+            "Current SKU (TRUE/FALSE)": [True, True, False],
+            "ADC":                      [10.0, 0.0, 4.0],
+            "Min Stock Level":          [30, 12, 5],
+            "Max Stock Level":          [120, 48, 20],
+            "Pack size":                [10, 1, 0],
+            "Unit Cost (Rs)":           [7.5, 12.0, 3.0],
+            # Free text mixing "ok" and 5 – Arrow cannot store this column
+            "Remarks":                  ["ok", 5, None],
+        })
+        master.to_excel(self._path("master.xlsx"), index=False)
+
+        write_lookup(pd.DataFrame({"Item Code": ["M001", "M002"], "Total Global Stock": [50.0, 3.0]}),
+                     self._path("global.xlsx"), "output")
+        write_lookup(pd.DataFrame({"Item\nCode": ["M001"], "Sum of Qty.": [20.0]}),
+                     self._path("main.xlsx"), "OUTPUT")
+
+        recent = (date.today() - timedelta(days=5)).isoformat()
+        pd.DataFrame({
+            "Store Name":     [InventoryCalculator.MAIN_STORE] * 2,
+            "Item Code":      ["M001", "M002"],
+            "POCreated Date": [recent, recent],
+            "Pen.Qty":        [5, 7],
+        }).to_csv(self._path("po.csv"), index=False)
+
+    def test_mixed_type_master_runs_twice(self):
+        self._write_inputs()
+        inputs = [self._path(f) for f in ("master.xlsx", "global.xlsx", "main.xlsx", "po.csv")]
+
+        pd.DataFrame({"old": [1]}).to_parquet(self._path("out.parquet"))  # an earlier run's copy
+        results = []
+        for _ in range(2):
+            calc = InventoryCalculator(log_fn=lambda msg: None)
+            results.append(calc.run(*inputs, self._path("out.xlsx")))
+
+        assert_frame_equal(results[0], results[1])
+        # The mixed-type sheet can't be written as Parquet either, so the
+        # stale copy must be gone rather than sit next to the new workbook
+        self.assertFalse(os.path.exists(self._path("out.parquet")))
+        truncated = [f for f in glob.glob(self._path("hpim_*")) if os.path.getsize(f) == 0]
+        self.assertEqual(truncated, [])
+
+
+if __name__ == "__main__":
+    unittest.main()